@@ -3,123 +3,447 @@
 Control plane for adaptive routing on BMv2.
 
 Responsibilities:
-  1. Compute shortest paths (Dijkstra) on the topology graph
+  1. Compute shortest paths (Floyd-Warshall, or Dijkstra per switch)
   2. Identify ECMP groups for multi-path destinations
   3. Populate ipv4_lpm, ecmp_group, ecmp_nhop, alt_nhop tables via Thrift
+     (one persistent runtime connection per switch, no CLI subprocesses)
   4. Set load_threshold register
   5. Periodic monitoring: read byte_counter registers, log utilization
 """
 
 import sys
 import os
+import io
 import time
 import argparse
+import contextlib
 import heapq
-import subprocess
+import math
 import signal
+import threading
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import numpy as np
+
+# BMv2 Thrift runtime (installed alongside simple_switch_CLI)
+import runtime_CLI
+from runtime_CLI import RuntimeAPI, PreType, ResType
+from bm_runtime.standard.ttypes import (BmAddEntryOptions, InvalidTableOperation,
+                                       TableOperationErrorCode)
 
 # Add topology module to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'topology'))
-from topo import get_topology_graph, get_host_info, get_switch_mac, get_thrift_port
+from topo import (get_topology_graph, get_host_info, get_switch_mac,
+                  get_thrift_port, graph_to_arrays, graph_to_csr,
+                  shortest_distances, NO_PORT)
 
 
 # ---------- Path Computation (Dijkstra + ECMP) ----------
 
-def dijkstra_all_paths(graph, source):
+# The topology is static for the lifetime of a run, so results are memoized
+# per graph (and per source/targets). The graph object is stored alongside
+# each result so a recycled id() can never return data for a different graph.
+_CSR_CACHE = {}
+_PATHS_CACHE = {}
+_NEXT_HOPS_CACHE = {}
+
+# Dijkstra's priority queue is a 4-ary heap: half the depth of a binary heap,
+# so fewer key comparisons per sift on push
+_HEAP_ARITY = 4
+
+# Below this many nodes the heapq Dijkstra beats the JIT kernel's call and
+# unpacking overhead (and numba need not be imported at all)
+_JIT_MIN_NODES = 32
+
+
+def build_csr(graph):
     """
-    Compute shortest paths from source to all other nodes.
-    Returns dict of {dest: [list of equal-cost paths]}.
-    Each path is a list of switch names.
+    Convert the adjacency dict into compressed sparse row (CSR) arrays.
+    Returns (name2idx, indptr, indices, cost, port_map): the neighbors of
+    node i are indices[indptr[i]:indptr[i+1]], with link costs in cost and
+    (local_port, remote_port) pairs in port_map at the same offsets.
     """
-    dist = {source: 0}
-    paths = {source: [[source]]}
-    pq = [(0, source)]
-    visited = set()
+    cached = _CSR_CACHE.get(id(graph))
+    if cached is not None and cached[0] is graph:
+        return cached[1]
 
+    indptr, indices, cost, local_port, remote_port, name2idx = graph_to_csr(graph)
+    csr = (name2idx, indptr, indices, cost.astype(np.float64),
+           np.stack((local_port, remote_port), axis=1))
+    _CSR_CACHE[id(graph)] = (graph, csr)
+    return csr
+
+
+def _dijkstra_csr(indptr, indices, cost, source, targets):
+    """
+    Array-only Dijkstra core (see _dijkstra_kernel() for the JIT build).
+    targets is a boolean mask of nodes to stop after (all False: no early
+    exit). Returns (dist, settled, tight) where tight[k] is True when edge k
+    (aligned with indices) lies on a shortest path to its head node.
+    """
+    n = indptr.shape[0] - 1
+    m = indices.shape[0]
+    dist = np.full(n, np.inf)
+    settled = np.zeros(n, dtype=np.bool_)
+    tight = np.zeros(m, dtype=np.bool_)
+    # Tight incoming edges of each node as a linked list (first_tight[v],
+    # then next_tight[k]), so a strict improvement clears only v's own
+    # edges; every edge is linked at most once, keeping this O(E) overall
+    first_tight = np.full(n, -1, dtype=np.int32)
+    next_tight = np.full(m, -1, dtype=np.int32)
+    remaining = 0
+    for i in range(n):
+        if targets[i]:
+            remaining += 1
+
+    # d-ary min-heap over parallel key/node arrays; every push follows a
+    # strict improvement, so there are at most one per edge plus the source
+    heap_key = np.empty(indices.shape[0] + 1)
+    heap_node = np.empty(indices.shape[0] + 1, dtype=np.int32)
+    heap_key[0] = 0.0
+    heap_node[0] = source
+    size = 1
+    dist[source] = 0.0
+
+    while size:
+        d = heap_key[0]
+        u = heap_node[0]
+        size -= 1
+        if size:
+            # Sift the last item down from the root
+            key = heap_key[size]
+            node = heap_node[size]
+            i = 0
+            while True:
+                first = _HEAP_ARITY * i + 1
+                if first >= size:
+                    break
+                child = first
+                for c in range(first + 1, min(first + _HEAP_ARITY, size)):
+                    if heap_key[c] < heap_key[child]:
+                        child = c
+                if heap_key[child] >= key:
+                    break
+                heap_key[i] = heap_key[child]
+                heap_node[i] = heap_node[child]
+                i = child
+            heap_key[i] = key
+            heap_node[i] = node
+
+        if settled[u]:
+            continue
+        settled[u] = True
+
+        if targets[u]:
+            remaining -= 1
+            if remaining == 0:
+                break
+
+        for k in range(indptr[u], indptr[u + 1]):
+            v = indices[k]
+            # Finalized nodes can't be improved; don't relax or push them
+            if settled[v]:
+                continue
+            new_dist = d + cost[k]
+            if new_dist < dist[v]:
+                dist[v] = new_dist
+                j = first_tight[v]
+                while j != -1:
+                    tight[j] = False
+                    j = next_tight[j]
+                tight[k] = True
+                first_tight[v] = k
+                # Sift the new entry up from the end
+                i = size
+                size += 1
+                while i > 0:
+                    parent = (i - 1) // _HEAP_ARITY
+                    if heap_key[parent] <= new_dist:
+                        break
+                    heap_key[i] = heap_key[parent]
+                    heap_node[i] = heap_node[parent]
+                    i = parent
+                heap_key[i] = new_dist
+                heap_node[i] = v
+            elif new_dist == dist[v]:
+                tight[k] = True
+                next_tight[k] = first_tight[v]
+                first_tight[v] = k
+
+    return dist, settled, tight
+
+
+def _dijkstra_heapq(indptr, indices, cost, source, targets):
+    """
+    Plain-Python Dijkstra over CSR lists, used for small graphs and when
+    numba is missing (interpreted, the array kernel pays for every numpy
+    scalar access).
+    targets is a set of nodes to stop after (empty: no early exit).
+    Returns {node: set of predecessors} for the settled nodes.
+    """
+    n = len(indptr) - 1
+    dist = [math.inf] * n
+    dist[source] = 0.0
+    preds = [None] * n
+    preds[source] = set()
+    settled = [False] * n
+    done = []
+    remaining = set(targets)
+    pq = [(0.0, source)]
     while pq:
         d, u = heapq.heappop(pq)
-        if u in visited:
+        if settled[u]:
             continue
-        visited.add(u)
+        settled[u] = True
+        done.append(u)
+        if u in remaining:
+            remaining.remove(u)
+            if not remaining:
+                break
+        for k in range(indptr[u], indptr[u + 1]):
+            v = indices[k]
+            if settled[v]:
+                continue
+            new_dist = d + cost[k]
+            if new_dist < dist[v]:
+                dist[v] = new_dist
+                preds[v] = {u}
+                heapq.heappush(pq, (new_dist, v))
+            elif new_dist == dist[v]:
+                preds[v].add(u)
+    return {v: preds[v] for v in done}
+
 
-        for neighbor, (_, _, cost) in graph[u].items():
-            new_dist = d + cost
-            if neighbor not in dist or new_dist < dist[neighbor]:
-                dist[neighbor] = new_dist
-                paths[neighbor] = [p + [neighbor] for p in paths[u]]
-                heapq.heappush(pq, (new_dist, neighbor))
-            elif new_dist == dist[neighbor]:
-                paths[neighbor].extend([p + [neighbor] for p in paths[u]])
+_DIJKSTRA_KERNEL = None
 
-    return paths
+
+def _dijkstra_kernel():
+    """
+    Return _dijkstra_csr JIT-compiled with numba, or None if numba is not
+    installed. Only the per-switch Dijkstra fallback needs it, so numba is
+    imported on first use rather than on every controller start.
+    """
+    global _DIJKSTRA_KERNEL
+    if _DIJKSTRA_KERNEL is None:
+        try:
+            from numba import njit
+        except ImportError:  # numba is optional; use _dijkstra_heapq
+            _DIJKSTRA_KERNEL = False
+        else:
+            _DIJKSTRA_KERNEL = njit(cache=True)(_dijkstra_csr)
+    return _DIJKSTRA_KERNEL or None
 
 
-def compute_next_hops(graph, source, paths):
+def dijkstra_all_paths(csr, source, targets=None):
+    """
+    Compute shortest paths from source to all other nodes of a build_csr()
+    graph. Returns the shortest-path DAG as {node: set of predecessors}; a
+    node reachable over several equal-cost paths has several predecessors.
+    If targets is given, stop as soon as all of them are settled; only
+    settled nodes are returned.
+    """
+    key = (id(csr), source, frozenset(targets) if targets else None)
+    cached = _PATHS_CACHE.get(key)
+    if cached is not None and cached[0] is csr:
+        return cached[1]
+
+    name2idx, indptr, indices, cost, _ = csr
+    names = list(name2idx)
+    target_idx = [name2idx[t] for t in targets] if targets else []
+    kernel = _dijkstra_kernel() if len(names) >= _JIT_MIN_NODES else None
+
+    if kernel is None:
+        idx_preds = _dijkstra_heapq(indptr.tolist(), indices.tolist(),
+                                    cost.tolist(), name2idx[source], target_idx)
+        preds = {names[v]: {names[u] for u in us}
+                 for v, us in idx_preds.items()}
+    else:
+        target_mask = np.zeros(len(names), dtype=np.bool_)
+        target_mask[target_idx] = True
+        _, settled, tight = kernel(indptr, indices, cost,
+                                   name2idx[source], target_mask)
+        # One pass over the tight edges, back to switch names; nodes left
+        # unsettled by an early exit are dropped
+        tail = np.repeat(np.arange(len(names)), np.diff(indptr))
+        preds = {names[v]: set() for v in np.flatnonzero(settled)}
+        for k in np.flatnonzero(tight):
+            v = names[indices[k]]
+            if v in preds:
+                preds[v].add(names[tail[k]])
+    _PATHS_CACHE[key] = (csr, preds)
+    return preds
+
+
+def compute_next_hops(graph, source, preds):
     """
     For each destination, determine the set of (next_hop_switch, egress_port, next_hop_port).
+    Walks the predecessor DAG back from each destination; every node whose
+    predecessor is the source is a first hop.
     Returns {dest_switch: [(egress_port, next_hop_mac)]}.
     """
+    cached = _NEXT_HOPS_CACHE.get((id(graph), source))
+    if cached is not None and cached[0] is graph and cached[1] is preds:
+        return cached[2]
+
+    # (egress_port, MAC of the next switch's receiving port) per neighbor,
+    # shared by every destination reached through that neighbor
+    nexthop_mac = {nbr: (local_port, get_switch_mac(nbr, remote_port))
+                   for nbr, (local_port, remote_port, _) in graph[source].items()}
+
     next_hops = {}
-    for dest, path_list in paths.items():
+    for dest in preds:
         if dest == source:
             continue
         hops = set()
-        for path in path_list:
-            next_sw = path[1]  # first hop after source
-            local_port, remote_port, _ = graph[source][next_sw]
-            # MAC of the next switch's receiving port
-            next_mac = get_switch_mac(next_sw, remote_port)
-            hops.add((local_port, next_mac))
+        seen = {dest}
+        stack = [dest]
+        while stack:
+            v = stack.pop()
+            for u in preds[v]:
+                if u == source:
+                    hops.add(nexthop_mac[v])
+                elif u not in seen:
+                    seen.add(u)
+                    stack.append(u)
         next_hops[dest] = list(hops)
+
+    _NEXT_HOPS_CACHE[(id(graph), source)] = (graph, preds, next_hops)
     return next_hops
 
 
-# ---------- Thrift CLI Interface ----------
+def all_pairs_next_hops(graph):
+    """
+    Compute ECMP next hops for every (source, dest) pair at once.
+    A single Floyd-Warshall sweep over a V x V distance matrix replaces one
+    Dijkstra run per switch. Returns {source: {dest: [(egress_port, next_hop_mac)]}},
+    i.e. compute_next_hops() output for every source.
+    """
+    cost, local_port, remote_port, name_to_idx = graph_to_arrays(graph)
+    dist = shortest_distances(cost)
+    nodes = list(name_to_idx)
+
+    # Neighbor v of u is a next hop towards every dest it reaches at
+    # dist[u, dest] - cost(u, v); ties give the ECMP successor sets.
+    all_next_hops = {}
+    for u, i in name_to_idx.items():
+        neighbors = np.flatnonzero(local_port[i] != NO_PORT)
+        # on_path[k, j]: neighbors[k] lies on a shortest path from u to j
+        on_path = ((cost[i, neighbors, None] + dist[neighbors] == dist[i])
+                   & np.isfinite(dist[i]))
+        hops = defaultdict(list)
+        for k, v in enumerate(neighbors):
+            hop = (int(local_port[i, v]),
+                   get_switch_mac(nodes[v], int(remote_port[i, v])))
+            for j in np.flatnonzero(on_path[k]):
+                hops[nodes[j]].append(hop)
+        all_next_hops[u] = dict(hops)
+    return all_next_hops
+
+
+# ---------- Thrift Runtime Interface ----------
+
+_P4_CONFIG_LOADED = False
+_P4_CONFIG_LOCK = threading.Lock()
+
+
+def _load_p4_config(client):
+    """Load the P4 JSON (tables, actions, registers) into runtime_CLI once."""
+    global _P4_CONFIG_LOADED
+    # runtime_CLI keeps the config in module globals; guard against
+    # switches being populated concurrently
+    with _P4_CONFIG_LOCK:
+        if not _P4_CONFIG_LOADED:
+            # All switches run the same program, so one switch's config suffices
+            runtime_CLI.load_json_config(client)
+            _P4_CONFIG_LOADED = True
+
 
 class SwitchController:
-    """Interface to BMv2 simple_switch via simple_switch_CLI (Thrift)."""
+    """Interface to BMv2 simple_switch over a persistent Thrift connection."""
 
-    def __init__(self, thrift_port):
+    def __init__(self, thrift_port, thrift_ip='localhost'):
         self.thrift_port = thrift_port
-
-    def _run_cmd(self, command):
-        """Send a command to simple_switch_CLI."""
-        cmd = f'echo "{command}" | simple_switch_CLI --thrift-port {self.thrift_port}'
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True,
-                                timeout=10)
-        return result.stdout
-
-    def table_add(self, table, action, match, params):
+        services = RuntimeAPI.get_thrift_services(PreType.SimplePreLAG)
+        self.client, mc_client = runtime_CLI.thrift_connect(
+            thrift_ip, thrift_port, services)
+        _load_p4_config(self.client)
+        self.api = RuntimeAPI(PreType.SimplePreLAG, self.client, mc_client)
+
+    def _res(self, type_name, name, res_type):
+        """Resolve a (possibly unqualified) P4 object name, e.g. ipv4_lpm."""
+        return self.api.get_res(type_name, name, res_type)
+
+    def cli(self, command):
+        """Run a simple_switch_CLI command in-process and return its output."""
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.api.onecmd(command)
+        return out.getvalue()
+
+    def table_add(self, table, action, match, params, log=print):
         """Add a table entry."""
-        match_str = ' '.join(str(m) for m in match)
-        params_str = ' '.join(str(p) for p in params)
-        cmd = f'table_add {table} {action} {match_str} => {params_str}'
-        return self._run_cmd(cmd)
+        return self.bulk_load([(table, action, match, params)], log)[0]
+
+    def bulk_load(self, entries, log=print):
+        """
+        Add many table entries back-to-back over the open connection.
+        entries is a list of (table, action, match, params); table/action
+        names are resolved once each. The batch is best-effort: an entry
+        with malformed data or one the switch rejects is reported to log
+        with its (table, match) and skipped; the rest are still installed.
+        Returns the entry handles in order (None for a skipped entry).
+        """
+        resolved = {}
+        handles = []
+        for table, action, match, params in entries:
+            if (table, action) not in resolved:
+                resolved[table, action] = (
+                    self._res('table', table, ResType.table),
+                    self._res('action', action, ResType.action))
+            tbl, act = resolved[table, action]
+            handle = None
+            try:
+                match_key = runtime_CLI.parse_match_key(tbl, [str(m) for m in match])
+                action_data = runtime_CLI.parse_runtime_data(act, [str(p) for p in params])
+                handle = self.client.bm_mt_add_entry(
+                    0, tbl.name, match_key, act.name, action_data,
+                    BmAddEntryOptions(priority=0))
+            except InvalidTableOperation as e:
+                # Report and carry on, as simple_switch_CLI does
+                code = TableOperationErrorCode._VALUES_TO_NAMES[e.code]
+                log(f'  ERROR: invalid table operation ({code}) on thrift port '
+                    f'{self.thrift_port}: {table} {match}')
+            except runtime_CLI.UIn_Error as e:
+                log(f'  ERROR: {e} on thrift port {self.thrift_port}: '
+                    f'{table} {match}')
+            handles.append(handle)
+        return handles
 
     def table_clear(self, table):
         """Clear all entries from a table."""
-        return self._run_cmd(f'table_clear {table}')
+        tbl = self._res('table', table, ResType.table)
+        self.client.bm_mt_clear_entries(0, tbl.name, False)
 
     def register_write(self, register, index, value):
         """Write a register value."""
-        return self._run_cmd(f'register_write {register} {index} {value}')
+        reg = self._res('register', register, ResType.register_array)
+        self.client.bm_register_write(0, reg.name, index, value)
 
     def register_read(self, register, index):
         """Read a register value."""
-        output = self._run_cmd(f'register_read {register} {index}')
-        # Parse output: "register_name[index] = value"
-        for line in output.split('\n'):
-            if '=' in line and register in line:
-                try:
-                    return int(line.split('=')[-1].strip())
-                except ValueError:
-                    pass
-        return 0
+        reg = self._res('register', register, ResType.register_array)
+        return self.client.bm_register_read(0, reg.name, index)
+
+    def register_read_all(self, register):
+        """Read every entry of a register array in one call."""
+        reg = self._res('register', register, ResType.register_array)
+        return self.client.bm_register_read_all(0, reg.name)
 
     def register_reset(self, register):
         """Reset all entries in a register to 0."""
-        return self._run_cmd(f'register_reset {register}')
+        reg = self._res('register', register, ResType.register_array)
+        self.client.bm_register_reset(0, reg.name)
 
 
 # ---------- Table Population ----------
@@ -141,22 +465,37 @@ SUBNET_TO_SWITCH = {
 }
 
 
-def populate_switch(switch_name, graph, host_info):
-    """Populate all tables for a single switch."""
+def populate_switch(switch_name, graph, host_info, next_hops=None, log=print):
+    """
+    Populate all tables for a single switch.
+    next_hops is this switch's entry from all_pairs_next_hops(); if omitted,
+    paths are computed with Dijkstra from this switch. Progress lines are
+    passed to log.
+    """
     thrift_port = get_thrift_port(switch_name)
     ctrl = SwitchController(thrift_port)
 
-    print(f'[{switch_name}] Clearing tables...')
+    # This switch's own port MACs (switch-facing ports plus host port 1)
+    port_mac = {local_port: get_switch_mac(switch_name, local_port)
+                for local_port, _, _ in graph[switch_name].values()}
+    port_mac[1] = get_switch_mac(switch_name, 1)
+
+    log(f'[{switch_name}] Clearing tables...')
     for table in ['ipv4_lpm', 'ecmp_group', 'ecmp_nhop', 'alt_nhop', 'smac_rewrite']:
         ctrl.table_clear(table)
 
     # Compute paths from this switch
-    paths = dijkstra_all_paths(graph, switch_name)
-    next_hops = compute_next_hops(graph, switch_name, paths)
+    if next_hops is None:
+        # Only the edge switches hosting a subnet need routes
+        targets = set(SUBNET_TO_SWITCH.values()) - {switch_name}
+        preds = dijkstra_all_paths(build_csr(graph), switch_name, targets)
+        next_hops = compute_next_hops(graph, switch_name, preds)
 
     ecmp_group_id = 1  # start from 1
+    alt_ports = set()  # alt_nhop is keyed by port alone
+    entries = []  # (table, action, match, params), installed in one pass
 
-    print(f'[{switch_name}] Installing forwarding rules...')
+    log(f'[{switch_name}] Installing forwarding rules...')
 
     for subnet, dest_switch in SUBNET_TO_SWITCH.items():
         if dest_switch == switch_name:
@@ -170,13 +509,13 @@ def populate_switch(switch_name, graph, host_info):
                     break
 
             if host_port is not None:
-                ctrl.table_add('ipv4_lpm', 'set_nhop',
-                               [subnet], [host_mac, host_port])
-                print(f'  LPM: {subnet} -> port {host_port} (local host)')
+                entries.append(('ipv4_lpm', 'set_nhop',
+                                [subnet], [host_mac, host_port]))
+                log(f'  LPM: {subnet} -> port {host_port} (local host)')
         else:
             # Remote subnet — check for ECMP
             if dest_switch not in next_hops:
-                print(f'  WARNING: no path from {switch_name} to {dest_switch}')
+                log(f'  WARNING: no path from {switch_name} to {dest_switch}')
                 continue
 
             hops = next_hops[dest_switch]
@@ -184,50 +523,74 @@ def populate_switch(switch_name, graph, host_info):
             if len(hops) == 1:
                 # Single path — direct next hop
                 port, mac = hops[0]
-                ctrl.table_add('ipv4_lpm', 'set_nhop',
-                               [subnet], [mac, port])
-                print(f'  LPM: {subnet} -> port {port} (single path)')
+                entries.append(('ipv4_lpm', 'set_nhop',
+                                [subnet], [mac, port]))
+                log(f'  LPM: {subnet} -> port {port} (single path)')
             else:
                 # Multiple equal-cost paths — ECMP
                 gid = ecmp_group_id
                 ecmp_group_id += 1
                 count = len(hops)
 
-                ctrl.table_add('ipv4_lpm', 'set_ecmp_group',
-                               [subnet], [gid])
-                ctrl.table_add('ecmp_group', 'set_ecmp_info',
-                               [gid], [count, 0])
+                entries.append(('ipv4_lpm', 'set_ecmp_group',
+                                [subnet], [gid]))
+                entries.append(('ecmp_group', 'set_ecmp_info',
+                                [gid], [count, 0]))
 
-                print(f'  LPM: {subnet} -> ECMP group {gid} ({count} paths)')
+                log(f'  LPM: {subnet} -> ECMP group {gid} ({count} paths)')
 
                 for idx, (port, mac) in enumerate(hops):
-                    ctrl.table_add('ecmp_nhop', 'set_ecmp_nhop',
-                                   [gid, idx], [mac, port])
-                    print(f'    ECMP[{gid}][{idx}]: port {port}, mac {mac}')
+                    entries.append(('ecmp_nhop', 'set_ecmp_nhop',
+                                    [gid, idx], [mac, port]))
+                    log(f'    ECMP[{gid}][{idx}]: port {port}, mac {mac}')
 
                 # Set up alternative next hops for adaptive rerouting
                 # For each ECMP member, the alt is the next member (round-robin)
+                # A port shared by several groups keeps its first alt
                 for idx, (port, mac) in enumerate(hops):
+                    if port in alt_ports:
+                        continue
+                    alt_ports.add(port)
                     alt_idx = (idx + 1) % count
                     alt_port, alt_mac = hops[alt_idx]
-                    ctrl.table_add('alt_nhop', 'set_alt_nhop',
-                                   [port], [alt_mac, alt_port])
-                    print(f'    ALT: port {port} -> alt port {alt_port}')
+                    entries.append(('alt_nhop', 'set_alt_nhop',
+                                    [port], [alt_mac, alt_port]))
+                    log(f'    ALT: port {port} -> alt port {alt_port}')
 
     # Install smac_rewrite entries for all ports
     for neighbor, (local_port, _, _) in graph[switch_name].items():
-        smac = get_switch_mac(switch_name, local_port)
-        ctrl.table_add('smac_rewrite', 'set_smac',
-                       [local_port], [smac])
+        entries.append(('smac_rewrite', 'set_smac',
+                        [local_port], [port_mac[local_port]]))
 
     # Also install smac for host port (port 1 on edge switches)
     if switch_name in ['s1', 's2', 's5', 's6']:
-        smac = get_switch_mac(switch_name, 1)
-        ctrl.table_add('smac_rewrite', 'set_smac', [1], [smac])
+        entries.append(('smac_rewrite', 'set_smac', [1], [port_mac[1]]))
 
+    ctrl.bulk_load(entries, log)
     return ctrl
 
 
+def populate_all(switches, graph, host_info):
+    """
+    Populate every switch concurrently (each has its own Thrift port).
+    Returns {switch_name: SwitchController}.
+    """
+    all_next_hops = all_pairs_next_hops(graph)
+    # Each switch's progress lines are buffered so the concurrent workers
+    # don't interleave them, and printed in switch order as each finishes,
+    # whether or not it succeeded; the first failure is raised afterwards
+    logs = {sw: [] for sw in switches}
+    with ThreadPoolExecutor(max_workers=len(switches)) as ex:
+        futures = [ex.submit(populate_switch, sw, graph, host_info,
+                             all_next_hops[sw], logs[sw].append)
+                   for sw in switches]
+        for sw, future in zip(switches, futures):
+            wait([future])
+            if logs[sw]:
+                print('\n'.join(logs[sw]))
+    return {sw: future.result() for sw, future in zip(switches, futures)}
+
+
 def set_threshold(controllers, threshold_bytes):
     """Set the load threshold on all switches."""
     for sw_name, ctrl in controllers.items():
@@ -242,28 +605,34 @@ def monitor_utilization(controllers, interval=5, reset=True):
     print(f'\n--- Monitoring utilization (every {interval}s) ---')
     print('Press Ctrl+C to stop.\n')
 
+    # Switches are polled concurrently, so a tick costs roughly one
+    # round trip rather than one per switch
+    pool = ThreadPoolExecutor(max_workers=len(controllers))
     try:
         while True:
+            dumps = dict(pool.map(
+                lambda kv: (kv[0], kv[1].register_read_all('byte_counter')),
+                controllers.items()))
+
             print(f'\n[{time.strftime("%H:%M:%S")}] Port byte counters:')
-            for sw_name, ctrl in sorted(controllers.items()):
+            for sw_name, values in sorted(dumps.items()):
                 ports = [info[0] for info in graph.get(sw_name, {}).values()]
                 # Include host port for edge switches
                 if sw_name in ['s1', 's2', 's5', 's6']:
                     ports = [1] + ports
-                counts = {}
-                for port in sorted(set(ports)):
-                    val = ctrl.register_read('byte_counter', port)
-                    counts[port] = val
+                counts = {port: values[port] for port in set(ports)}
                 port_str = ', '.join(f'p{p}={v}' for p, v in sorted(counts.items()))
                 print(f'  {sw_name}: {port_str}')
 
             if reset:
-                for ctrl in controllers.values():
-                    ctrl.register_reset('byte_counter')
+                list(pool.map(lambda c: c.register_reset('byte_counter'),
+                              controllers.values()))
 
             time.sleep(interval)
     except KeyboardInterrupt:
         print('\nMonitoring stopped.')
+    finally:
+        pool.shutdown()
 
 
 # ---------- Main ----------
@@ -288,12 +657,8 @@ def main():
     print('=' * 60)
 
     # Populate tables on all switches
-    controllers = {}
     all_switches = ['s1', 's2', 's3', 's4', 's5', 's6']
-
-    for sw in all_switches:
-        ctrl = populate_switch(sw, graph, host_info)
-        controllers[sw] = ctrl
+    controllers = populate_all(all_switches, graph, host_info)
 
     # Set load threshold
     set_threshold(controllers, args.threshold)
@@ -7,6 +7,7 @@ PROJECT_DIR="$(dirname "$SCRIPT_DIR")"
 cd "$PROJECT_DIR"
 
 P4_JSON="build/adaptive_routing.json"
+export P4_MININET_PATH="${P4_MININET_PATH:-$HOME/src/behavioral-model/mininet}"
 
 echo "============================================"
 echo "  Adaptive Routing - BMv2 Demo"
@@ -22,7 +23,7 @@ echo "  Done."
 echo ""
 echo "[2/3] Starting Mininet topology..."
 echo "  (Topology will run in background)"
-sudo python3 topology/topo.py --p4-json "$P4_JSON" --cli &
+sudo P4_MININET_PATH="$P4_MININET_PATH" python3 topology/topo.py --p4-json "$P4_JSON" --cli &
 TOPO_PID=$!
 
 # Wait for switches to come up
@@ -16,23 +16,26 @@ Adaptive:  S1 port 2 exceeds threshold -> ECMP flows reroute to port 4.
 Must be run as root:  sudo python3 tests/benchmark.py
 """
 
+import io
 import os
 import sys
 import time
-import json
 import threading
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import ijson
+import numpy as np
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'topology'))
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'controller'))
 
-from mininet.net import Mininet
 from mininet.link import TCLink
 from mininet.log import setLogLevel, info
 
-from topo import AdaptiveRoutingTopo, get_host_info, get_switch_mac, get_thrift_port
-from controller import (populate_switch, set_threshold, get_topology_graph,
-                         SwitchController)
+from topo import (AdaptiveRoutingTopo, AdaptiveRoutingNet, configure_hosts,
+                  get_host_info)
+from controller import populate_all, set_threshold, get_topology_graph
 
 # ---------------------------------------------------------------------------
 # Configuration
@@ -62,37 +65,34 @@ TEST_DURATION      = 20
 # ---------------------------------------------------------------------------
 
 def jains_fairness(vals):
-    if not vals or all(v == 0 for v in vals):
-        return 0.0
-    n, s, s2 = len(vals), sum(vals), sum(v*v for v in vals)
-    return (s*s) / (n*s2) if s2 else 0.0
+    a = np.asarray(vals, dtype=np.float64)
+    s2 = (a * a).sum()
+    return float(a.sum() ** 2 / (len(a) * s2)) if s2 else 0.0
 
 
 def coeff_var(vals):
-    if not vals or all(v == 0 for v in vals):
-        return 0.0
-    n = len(vals)
-    mean = sum(vals) / n
-    if mean == 0:
-        return 0.0
-    return (sum((v-mean)**2 for v in vals) / n) ** 0.5 / mean
+    a = np.asarray(vals, dtype=np.float64)
+    mean = a.mean() if len(a) else 0.0
+    return float(a.std() / mean) if mean else 0.0
 
 
-def set_all_thresholds(threshold):
-    for i in range(1, 7):
-        SwitchController(get_thrift_port(f's{i}')).register_write(
-            'load_threshold', 0, threshold)
+def set_all_thresholds(controllers, threshold):
+    for ctrl in controllers.values():
+        ctrl.register_write('load_threshold', 0, threshold)
 
 
-def reset_all_counters():
-    for i in range(1, 7):
-        SwitchController(get_thrift_port(f's{i}')).register_reset(
-            'byte_counter')
+def reset_all_counters(controllers, pool=None):
+    # One short RPC per switch, issued in parallel over the open connections;
+    # callers resetting repeatedly pass in a long-lived pool
+    if pool is None:
+        with ThreadPoolExecutor(max_workers=len(controllers)) as ex:
+            return reset_all_counters(controllers, ex)
+    list(pool.map(lambda c: c.register_reset('byte_counter'),
+                  controllers.values()))
 
 
-def read_s1_port_counters():
+def read_s1_port_counters(ctrl):
     """Read S1 port 2 (direct) and port 4 (via S5) counters."""
-    ctrl = SwitchController(get_thrift_port('s1'))
     return {
         'port2_direct': ctrl.register_read('byte_counter', 2),
         'port4_via_s5': ctrl.register_read('byte_counter', 4),
@@ -100,40 +100,49 @@ def read_s1_port_counters():
 
 
 class PeriodicReset:
-    def __init__(self, interval):
+    def __init__(self, interval, controllers):
         self.interval = interval
+        self.controllers = controllers
         self._stop = threading.Event()
 
     def start(self):
         self._stop.clear()
+        self._pool = ThreadPoolExecutor(max_workers=len(self.controllers))
         self._t = threading.Thread(target=self._run, daemon=True)
         self._t.start()
 
     def stop(self):
         self._stop.set()
         self._t.join(timeout=5)
+        self._pool.shutdown(wait=False)
 
     def _run(self):
         while not self._stop.wait(self.interval):
-            reset_all_counters()
+            reset_all_counters(self.controllers, self._pool)
+
+
+# Throughput fields in iperf3 -J output, in order of preference:
+# UDP sum_received (bytes that actually arrived at the server), then
+# TCP sum_sent, then the generic sum
+_IPERF_RATE_KEYS = ('end.sum_received.bits_per_second',
+                    'end.sum_sent.bits_per_second',
+                    'end.sum.bits_per_second')
 
 
 def parse_iperf_json(raw):
     """Extract *received* throughput from iperf3 -J output (UDP or TCP)."""
+    # Stream the document once and keep only the summary rates instead of
+    # materialising the per-interval records
+    rates = {}
     try:
-        d = json.loads(raw)
-        end = d.get('end', {})
-        # UDP: prefer sum_received (actual bytes that arrived at server)
-        if 'sum_received' in end:
-            return end['sum_received']['bits_per_second'] / 1e6
-        # TCP: sum_sent is meaningful
-        if 'sum_sent' in end:
-            return end['sum_sent']['bits_per_second'] / 1e6
-        # Fallback
-        if 'sum' in end:
-            return end['sum']['bits_per_second'] / 1e6
-    except Exception:
+        for prefix, event, value in ijson.parse(io.BytesIO(raw)):
+            if event == 'number' and prefix in _IPERF_RATE_KEYS:
+                rates[prefix] = float(value)
+    except ijson.JSONError:
         pass
+    for key in _IPERF_RATE_KEYS:
+        if key in rates:
+            return rates[key] / 1e6
     return 0.0
 
 # ---------------------------------------------------------------------------
@@ -159,7 +168,7 @@ def run_flows(net, flows, duration):
     results = []
     for src, dst, port, bw, p in procs:
         out, _ = p.communicate(timeout=duration + 30)
-        tp = parse_iperf_json(out.decode())
+        tp = parse_iperf_json(out)
         results.append((src, dst, port, bw, tp))
 
     # Cleanup servers
@@ -169,7 +178,8 @@ def run_flows(net, flows, duration):
     return results
 
 
-def run_scenario(net, name, threshold, flows, duration, reset_counters):
+def run_scenario(net, controllers, name, threshold, flows, duration,
+                 reset_counters):
     hdr = f'  Scenario: {name}'
     print(f'\n{"=" * 64}')
     print(hdr)
@@ -177,13 +187,13 @@ def run_scenario(net, name, threshold, flows, duration, reset_counters):
           f'Counter reset: {"every "+str(COUNTER_RESET_SEC)+"s" if reset_counters else "off"}')
     print(f'{"=" * 64}')
 
-    set_all_thresholds(threshold)
-    reset_all_counters()
+    set_all_thresholds(controllers, threshold)
+    reset_all_counters(controllers)
     time.sleep(1)
 
     resetter = None
     if reset_counters:
-        resetter = PeriodicReset(COUNTER_RESET_SEC)
+        resetter = PeriodicReset(COUNTER_RESET_SEC, controllers)
         resetter.start()
 
     results = run_flows(net, flows, duration)
@@ -191,7 +201,7 @@ def run_scenario(net, name, threshold, flows, duration, reset_counters):
     if resetter:
         resetter.stop()
 
-    counters = read_s1_port_counters()
+    counters = read_s1_port_counters(controllers['s1'])
 
     # Separate heavy (non-ECMP) and ECMP flows
     heavy = [(s,d,p,bw,tp) for s,d,p,bw,tp in results if d == 'h2']
@@ -242,37 +252,26 @@ def run_scenario(net, name, threshold, flows, duration, reset_counters):
 
 def build_network():
     p4_json = os.path.abspath('build/adaptive_routing.json')
-    if not os.path.exists(p4_json):
+    try:
+        os.stat(p4_json)
+    except FileNotFoundError:
         print(f'Error: {p4_json} not found. Run "make compile" first.')
         sys.exit(1)
 
     setLogLevel('warning')
     topo = AdaptiveRoutingTopo(p4_json=p4_json, bw=10)
-    net = Mininet(topo=topo, controller=None)
+    net = AdaptiveRoutingNet(topo=topo, controller=None)
     net.start()
 
     host_info = get_host_info()
-    for h in net.hosts:
-        h.cmd('sysctl -w net.ipv6.conf.all.disable_ipv6=1')
-        h.cmd('sysctl -w net.ipv6.conf.default.disable_ipv6=1')
-    for h in net.hosts:
-        _, _, _, _, gw = host_info[h.name]
-        h.cmd(f'ip route add default via {gw} dev eth0')
-    for h in net.hosts:
-        for other, (sw, port, ip, mac, gw) in host_info.items():
-            if other != h.name:
-                h.cmd(f'arp -s {ip} {mac}')
-        sw_name = host_info[h.name][0]
-        gw_ip = host_info[h.name][4]
-        gw_mac = get_switch_mac(sw_name, host_info[h.name][1])
-        h.cmd(f'arp -s {gw_ip} {gw_mac}')
+    configure_hosts(net, host_info)
 
     time.sleep(2)
     graph = get_topology_graph()
-    for sw in ['s1', 's2', 's3', 's4', 's5', 's6']:
-        populate_switch(sw, graph, host_info)
+    controllers = populate_all(['s1', 's2', 's3', 's4', 's5', 's6'],
+                               graph, host_info)
 
-    return net
+    return net, controllers
 
 
 # ---------------------------------------------------------------------------
@@ -292,7 +291,7 @@ def main():
     print('  Static ECMP  vs  Adaptive Load-Balancing')
     print('=' * 64)
 
-    net = build_network()
+    net, controllers = build_network()
 
     print('\nVerifying connectivity … ', end='', flush=True)
     loss = net.pingAll(timeout='1')
@@ -302,13 +301,13 @@ def main():
     try:
         if not args.skip_baseline:
             runs.append(run_scenario(
-                net, 'Static ECMP (Baseline)', BASELINE_THRESHOLD,
+                net, controllers, 'Static ECMP (Baseline)', BASELINE_THRESHOLD,
                 FLOW_SPECS, args.duration, reset_counters=False))
             time.sleep(3)
 
         if not args.skip_adaptive:
             runs.append(run_scenario(
-                net, 'Adaptive Routing', args.threshold,
+                net, controllers, 'Adaptive Routing', args.threshold,
                 FLOW_SPECS, args.duration, reset_counters=True))
 
         if len(runs) == 2:
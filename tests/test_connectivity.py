@@ -13,51 +13,34 @@ import time
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'topology'))
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'controller'))
 
-from mininet.net import Mininet
 from mininet.link import TCLink
 from mininet.cli import CLI
 from mininet.log import setLogLevel, info
 
-from topo import AdaptiveRoutingTopo, get_host_info, get_switch_mac
-from controller import (populate_switch, set_threshold, get_topology_graph,
-                         SwitchController, get_thrift_port)
+from topo import (AdaptiveRoutingTopo, AdaptiveRoutingNet, configure_hosts,
+                  get_host_info)
+from controller import populate_all, set_threshold, get_topology_graph
 
 
 def main():
     setLogLevel('info')
 
     p4_json = os.path.abspath('build/adaptive_routing.json')
-    if not os.path.exists(p4_json):
+    try:
+        os.stat(p4_json)
+    except FileNotFoundError:
         print(f'Error: {p4_json} not found. Run "make compile" first.')
         sys.exit(1)
 
     # --- Start topology ---
     info('*** Creating topology\n')
     topo = AdaptiveRoutingTopo(p4_json=p4_json, bw=10)
-    net = Mininet(topo=topo, controller=None)
+    net = AdaptiveRoutingNet(topo=topo, controller=None)
     net.start()
 
-    # Disable IPv6
-    for host in net.hosts:
-        host.cmd('sysctl -w net.ipv6.conf.all.disable_ipv6=1')
-        host.cmd('sysctl -w net.ipv6.conf.default.disable_ipv6=1')
-
-    # P4Host skips Host.config(), so default routes aren't applied. Add manually.
+    # Disable IPv6, add default routes and static ARP entries
     host_info = get_host_info()
-    for h in net.hosts:
-        sw_name, port, ip, mac, gw = host_info[h.name]
-        h.cmd(f'ip route add default via {gw} dev eth0')
-        info(f'  {h.name}: default route via {gw}\n')
-
-    # Set static ARP entries
-    for h in net.hosts:
-        for other_name, (sw, port, ip, mac, gw) in host_info.items():
-            if other_name != h.name:
-                h.cmd(f'arp -s {ip} {mac}')
-        sw_name = host_info[h.name][0]
-        gw_ip = host_info[h.name][4]
-        gw_mac = get_switch_mac(sw_name, host_info[h.name][1])
-        h.cmd(f'arp -s {gw_ip} {gw_mac}')
+    configure_hosts(net, host_info)
 
     info('*** Waiting for switches to initialize...\n')
     time.sleep(2)
@@ -65,26 +48,21 @@ def main():
     # --- Populate tables ---
     info('\n*** Populating forwarding tables...\n')
     graph = get_topology_graph()
-    controllers = {}
-    for sw in ['s1', 's2', 's3', 's4', 's5', 's6']:
-        ctrl = populate_switch(sw, graph, host_info)
-        controllers[sw] = ctrl
+    controllers = populate_all(['s1', 's2', 's3', 's4', 's5', 's6'],
+                               graph, host_info)
 
     set_threshold(controllers, 500000)
 
     # --- Verify table entries on S1 ---
     info('\n*** Verifying S1 table entries...\n')
-    ctrl_s1 = SwitchController(get_thrift_port('s1'))
-    result = ctrl_s1._run_cmd('table_dump ipv4_lpm')
+    result = controllers['s1'].cli('table_dump ipv4_lpm')
     info(f'S1 ipv4_lpm:\n{result}\n')
 
     # --- Debug: check host network config ---
     info('\n*** Host network configuration:\n')
     for h in net.hosts:
         info(f'\n--- {h.name} ---\n')
-        info(h.cmd('ip addr show') + '\n')
-        info(h.cmd('ip route show') + '\n')
-        info(h.cmd('arp -n') + '\n')
+        info(h.cmd('ip addr show; echo; ip route show; echo; arp -n') + '\n')
 
     # --- Run ping tests ---
     info('\n*** Running ping tests...\n')
@@ -19,23 +19,37 @@ import os
 import sys
 import argparse
 import json
+import functools
+import tempfile
+from types import MappingProxyType
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 from mininet.net import Mininet
 from mininet.topo import Topo
-from mininet.link import TCLink
+from mininet.link import Link
 from mininet.cli import CLI
 from mininet.log import setLogLevel, info
 
-# BMv2 switch integration — add known locations to path
+try:
+    from pyroute2 import NetNS, NetlinkError
+    from pyroute2.netlink.rtnl.ndmsg import states as NUD_STATES
+except ImportError:  # pyroute2 is optional; fall back to ip/arp commands
+    NetNS = None
+
+# BMv2 switch integration — P4_MININET_PATH points at behavioral-model/mininet
+# (the Makefile exports it)
 # IMPORTANT: BMv2 native version first (Thrift-based), tutorials version uses gRPC
-_p4_mininet_paths = [
-    '/home/philip/src/behavioral-model/mininet',
-]
-for _p in _p4_mininet_paths:
-    if os.path.isdir(_p) and _p not in sys.path:
-        sys.path.insert(0, _p)
+_p = os.environ.get('P4_MININET_PATH')
+if _p:
+    sys.path.insert(0, _p)
 
-from p4_mininet import P4Switch, P4Host
+try:
+    from p4_mininet import P4Switch, P4Host
+except ImportError as e:
+    raise ImportError('p4_mininet not found: set P4_MININET_PATH to the '
+                      'mininet/ directory of a behavioral-model checkout') from e
 
 
 # Default link parameters
@@ -43,147 +57,480 @@ DEFAULT_BW = 10      # Mbps
 DEFAULT_DELAY = '1ms'
 DEFAULT_LOSS = 0      # percent
 
+# Host links (unshaped veth so the bottleneck is in the core); each is
+# port 1 of its edge switch
+HOST_LINKS = [
+    ('h1', 's1'),   # s1-eth1
+    ('h2', 's2'),   # s2-eth1
+    ('h3', 's5'),   # s5-eth1
+    ('h4', 's6'),   # s6-eth1
+]
+
+# Switch-to-switch links (core). Mininet numbers ports in the order links
+# are added, so this order fixes the ports in the topology graph below.
+CORE_LINKS = [
+    # S1-S2 direct (path 1)
+    ('s1', 's2'),   # s1-eth2, s2-eth2
+    # S1-S3, S3-S4, S4-S2 (path 2 via middle)
+    ('s1', 's3'),   # s1-eth3, s3-eth1
+    ('s3', 's4'),   # s3-eth2, s4-eth1
+    ('s4', 's2'),   # s4-eth2, s2-eth3
+    # S1-S5, S5-S6, S6-S2 (path 3 via bottom)
+    ('s1', 's5'),   # s1-eth4, s5-eth2
+    ('s5', 's6'),   # s5-eth3, s6-eth2
+    ('s6', 's2'),   # s6-eth3, s2-eth4
+    # S3-S5, S4-S6 cross links (additional connectivity)
+    ('s3', 's5'),   # s3-eth3, s5-eth4
+    ('s4', 's6'),   # s4-eth3, s6-eth4
+]
+
+
+def prewarm_file(path):
+    """Ask the kernel to start reading path into the page cache."""
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    finally:
+        os.close(fd)
+
+
+class BatchP4Switch(P4Switch):
+    """
+    P4Switch that is started together with its siblings.
+
+    Mininet calls start() on each switch in turn, then batchStartup() once
+    per switch class. P4Switch.start() blocks for over a second per switch
+    (a fixed sleep, then polling until the Thrift server answers), so while
+    batch is set (AdaptiveRoutingNet.start() sets it around Mininet.start(),
+    as with OVSSwitch) start() only records the controllers and
+    batchStartup() runs the real startup of all switches concurrently.
+    Otherwise, e.g. `switch s1 start` from the CLI, start() is P4Switch's.
+    """
+
+    batch = False
+
+    def start(self, controllers):
+        if BatchP4Switch.batch:
+            self._pending_controllers = controllers
+        else:
+            P4Switch.start(self, controllers)
+
+    @classmethod
+    def batchStartup(cls, switches, **kwargs):
+        pending = [sw for sw in switches
+                   if getattr(sw, '_pending_controllers', None) is not None]
+        if not pending:
+            return switches
+        # Every switch loads the same P4 JSON; read it into the page cache
+        # once up front so the concurrent simple_switch processes hit warm pages
+        for json_path in {sw.json_path for sw in pending if sw.json_path}:
+            prewarm_file(json_path)
+
+        def start(sw):
+            controllers, sw._pending_controllers = sw._pending_controllers, None
+            P4Switch.start(sw, controllers)
+
+        with ThreadPoolExecutor(max_workers=len(pending)) as ex:
+            list(ex.map(start, pending))
+        return switches
+
 
 class AdaptiveRoutingTopo(Topo):
     """6-switch topology with 3 parallel paths."""
 
-    def __init__(self, p4_json, bw=DEFAULT_BW, host_bw=None, **kwargs):
+    def __init__(self, p4_json, bw=DEFAULT_BW, **kwargs):
         Topo.__init__(self, **kwargs)
 
         self.bw = bw
-        self.host_bw = host_bw or bw * 10   # host links faster than core
         self.p4_json = p4_json
+        # (node1, node2, bw, delay, loss) per link, applied by shape_links()
+        self.link_specs = []
 
         # --- Switches ---
-        s1 = self.addSwitch('s1', cls=P4Switch, sw_path='simple_switch',
-                            json_path=p4_json, thrift_port=9090,
-                            device_id=1, log_console=False)
-        s2 = self.addSwitch('s2', cls=P4Switch, sw_path='simple_switch',
-                            json_path=p4_json, thrift_port=9091,
-                            device_id=2, log_console=False)
-        s3 = self.addSwitch('s3', cls=P4Switch, sw_path='simple_switch',
-                            json_path=p4_json, thrift_port=9092,
-                            device_id=3, log_console=False)
-        s4 = self.addSwitch('s4', cls=P4Switch, sw_path='simple_switch',
-                            json_path=p4_json, thrift_port=9093,
-                            device_id=4, log_console=False)
-        s5 = self.addSwitch('s5', cls=P4Switch, sw_path='simple_switch',
-                            json_path=p4_json, thrift_port=9094,
-                            device_id=5, log_console=False)
-        s6 = self.addSwitch('s6', cls=P4Switch, sw_path='simple_switch',
-                            json_path=p4_json, thrift_port=9095,
-                            device_id=6, log_console=False)
+        self.addSwitch('s1', cls=BatchP4Switch, sw_path='simple_switch',
+                       json_path=p4_json, thrift_port=9090,
+                       device_id=1, log_console=False)
+        self.addSwitch('s2', cls=BatchP4Switch, sw_path='simple_switch',
+                       json_path=p4_json, thrift_port=9091,
+                       device_id=2, log_console=False)
+        self.addSwitch('s3', cls=BatchP4Switch, sw_path='simple_switch',
+                       json_path=p4_json, thrift_port=9092,
+                       device_id=3, log_console=False)
+        self.addSwitch('s4', cls=BatchP4Switch, sw_path='simple_switch',
+                       json_path=p4_json, thrift_port=9093,
+                       device_id=4, log_console=False)
+        self.addSwitch('s5', cls=BatchP4Switch, sw_path='simple_switch',
+                       json_path=p4_json, thrift_port=9094,
+                       device_id=5, log_console=False)
+        self.addSwitch('s6', cls=BatchP4Switch, sw_path='simple_switch',
+                       json_path=p4_json, thrift_port=9095,
+                       device_id=6, log_console=False)
 
         # --- Hosts ---
-        h1 = self.addHost('h1', cls=P4Host, ip='10.0.1.1/24',
-                          mac='00:00:00:00:01:01',
-                          defaultRoute='via 10.0.1.254')
-        h2 = self.addHost('h2', cls=P4Host, ip='10.0.2.1/24',
-                          mac='00:00:00:00:02:01',
-                          defaultRoute='via 10.0.2.254')
-        h3 = self.addHost('h3', cls=P4Host, ip='10.0.5.1/24',
-                          mac='00:00:00:00:05:01',
-                          defaultRoute='via 10.0.5.254')
-        h4 = self.addHost('h4', cls=P4Host, ip='10.0.6.1/24',
-                          mac='00:00:00:00:06:01',
-                          defaultRoute='via 10.0.6.254')
-
-        sw_opts = dict(bw=bw, delay=DEFAULT_DELAY, loss=DEFAULT_LOSS,
-                       cls=TCLink)
-        host_opts = dict(bw=self.host_bw, delay=DEFAULT_DELAY,
-                         loss=DEFAULT_LOSS, cls=TCLink)
-
-        # --- Host links (high bandwidth so bottleneck is in the core) ---
-        self.addLink(h1, s1, **host_opts)  # s1-eth1
-        self.addLink(h2, s2, **host_opts)  # s2-eth1
-        self.addLink(h3, s5, **host_opts)  # s5-eth1
-        self.addLink(h4, s6, **host_opts)  # s6-eth1
-
-        # --- Switch-to-switch links (10 Mbps core) ---
-        # S1-S2 direct (path 1)
-        self.addLink(s1, s2, **sw_opts)  # s1-eth2, s2-eth2
-
-        # S1-S3, S3-S4, S4-S2 (path 2 via middle)
-        self.addLink(s1, s3, **sw_opts)  # s1-eth3, s3-eth1
-        self.addLink(s3, s4, **sw_opts)  # s3-eth2, s4-eth1
-        self.addLink(s4, s2, **sw_opts)  # s4-eth2, s2-eth3
-
-        # S1-S5, S5-S6, S6-S2 (path 3 via bottom)
-        self.addLink(s1, s5, **sw_opts)  # s1-eth4, s5-eth2
-        self.addLink(s5, s6, **sw_opts)  # s5-eth3, s6-eth2
-        self.addLink(s6, s2, **sw_opts)  # s6-eth3, s2-eth4
-
-        # S3-S5, S4-S6 cross links (additional connectivity)
-        self.addLink(s3, s5, **sw_opts)  # s3-eth3, s5-eth4
-        self.addLink(s4, s6, **sw_opts)  # s4-eth3, s6-eth4
+        self.addHost('h1', cls=P4Host, ip='10.0.1.1/24',
+                     mac='00:00:00:00:01:01',
+                     defaultRoute='via 10.0.1.254')
+        self.addHost('h2', cls=P4Host, ip='10.0.2.1/24',
+                     mac='00:00:00:00:02:01',
+                     defaultRoute='via 10.0.2.254')
+        self.addHost('h3', cls=P4Host, ip='10.0.5.1/24',
+                     mac='00:00:00:00:05:01',
+                     defaultRoute='via 10.0.5.254')
+        self.addHost('h4', cls=P4Host, ip='10.0.6.1/24',
+                     mac='00:00:00:00:06:01',
+                     defaultRoute='via 10.0.6.254')
+
+        sw_opts = dict(bw=bw, delay=DEFAULT_DELAY, loss=DEFAULT_LOSS)
+
+        # --- Links ---
+        for host, switch in HOST_LINKS:
+            self.addLink(host, switch)
+        for node1, node2 in CORE_LINKS:
+            self.addLink(node1, node2, **sw_opts)
+
+    def addLink(self, node1, node2, bw=None, delay=None, loss=None, **opts):
+        """
+        Add a plain (unshaped) link. Shaping parameters are only recorded
+        here; shape_links() applies them in bulk once the network is up
+        (AdaptiveRoutingNet.start() does this).
+        """
+        if bw is not None:
+            self.link_specs.append((node1, node2, bw, delay, loss))
+        opts.setdefault('cls', Link)
+        return Topo.addLink(self, node1, node2, **opts)
+
+
+def _tc_batch_lines(intf, bw, delay, loss):
+    """tc -batch lines equivalent to TCLink's htb + netem shaping of intf."""
+    netem = f'delay {delay}' + (f' loss {loss}%' if loss else '')
+    return [
+        f'qdisc add dev {intf} root handle 5:0 htb default 1',
+        f'class add dev {intf} parent 5:0 classid 5:1 htb rate {bw}Mbit burst 15k',
+        f'qdisc add dev {intf} parent 5:1 handle 10: netem {netem}',
+    ]
+
+
+def shape_links(net, topo):
+    """
+    Apply the topology's link bandwidth/delay/loss after net.start().
+    AdaptiveRoutingNet calls this itself; a second call on the same net is
+    a no-op. Raises RuntimeError if tc reports an error.
+
+    TCLink runs several tc commands per interface. Here all rules for one
+    network namespace go into a single `tc -batch` file instead. Only core
+    links are shaped, so in practice that is one file for the root
+    namespace (every switch port).
+    """
+    if getattr(net, 'links_shaped', False):
+        return
+    batches = defaultdict(list)
+    for node1, node2, bw, delay, loss in topo.link_specs:
+        for link in net.linksBetween(net[node1], net[node2]):
+            for intf in (link.intf1, link.intf2):
+                # Switches share the root namespace, hosts have their own
+                ns = intf.node if intf.node.inNamespace else None
+                batches[ns].extend(_tc_batch_lines(intf, bw, delay, loss))
+
+    for ns, lines in batches.items():
+        runner = ns if ns is not None else net.switches[0]
+        with tempfile.NamedTemporaryFile('w', prefix='tc-', suffix='.batch') as f:
+            f.write('\n'.join(lines) + '\n')
+            f.flush()
+            out = runner.cmd(f'tc -force -batch {f.name}')
+        if out.strip():
+            raise RuntimeError(f'tc batch on {runner.name} failed: {out.strip()}')
+    net.links_shaped = True
+
+
+class AdaptiveRoutingNet(Mininet):
+    """
+    Mininet that starts the BMv2 switches concurrently and shapes the
+    topology's links as part of start(), so the core bandwidth/delay limits
+    cannot be left out by a caller.
+    """
+
+    def start(self):
+        # Defer BatchP4Switch startup to one concurrent batchStartup()
+        BatchP4Switch.batch = True
+        try:
+            Mininet.start(self)
+        finally:
+            BatchP4Switch.batch = False
+        try:
+            shape_links(self, self.topo)
+        except RuntimeError:
+            # Don't leave a running network behind with unshaped links
+            self.stop()
+            raise
+
+
+# Topology adjacency for path computation: {switch: {neighbor: (local_port,
+# remote_port, cost)}}. Port numbering follows Mininet addLink order:
+#   - Port 1 on edge switches = host port
+#   - Subsequent ports = switch-switch links
+# Read-only: built once at import and handed out to every caller.
+_TOPOLOGY_GRAPH = MappingProxyType({
+    's1': MappingProxyType({
+        's2': (2, 2, 1),   # s1-eth2 <-> s2-eth2
+        's3': (3, 1, 1),   # s1-eth3 <-> s3-eth1
+        's5': (4, 2, 1),   # s1-eth4 <-> s5-eth2
+    }),
+    's2': MappingProxyType({
+        's1': (2, 2, 1),   # s2-eth2 <-> s1-eth2
+        's4': (3, 2, 1),   # s2-eth3 <-> s4-eth2
+        's6': (4, 3, 1),   # s2-eth4 <-> s6-eth3
+    }),
+    's3': MappingProxyType({
+        's1': (1, 3, 1),   # s3-eth1 <-> s1-eth3
+        's4': (2, 1, 1),   # s3-eth2 <-> s4-eth1
+        's5': (3, 4, 1),   # s3-eth3 <-> s5-eth4
+    }),
+    's4': MappingProxyType({
+        's3': (1, 2, 1),   # s4-eth1 <-> s3-eth2
+        's2': (2, 3, 1),   # s4-eth2 <-> s2-eth3
+        's6': (3, 4, 1),   # s4-eth3 <-> s6-eth4
+    }),
+    's5': MappingProxyType({
+        's1': (2, 4, 1),   # s5-eth2 <-> s1-eth4
+        's6': (3, 2, 1),   # s5-eth3 <-> s6-eth2
+        's3': (4, 3, 1),   # s5-eth4 <-> s3-eth3
+    }),
+    's6': MappingProxyType({
+        's5': (2, 3, 1),   # s6-eth2 <-> s5-eth3
+        's2': (3, 4, 1),   # s6-eth3 <-> s2-eth4
+        's4': (4, 3, 1),   # s6-eth4 <-> s4-eth3
+    }),
+})
+
+
+# {host_name: (switch, port, ip, mac, gateway)}
+_HOST_INFO = MappingProxyType({
+    'h1': ('s1', 1, '10.0.1.1', '00:00:00:00:01:01', '10.0.1.254'),
+    'h2': ('s2', 1, '10.0.2.1', '00:00:00:00:02:01', '10.0.2.254'),
+    'h3': ('s5', 1, '10.0.5.1', '00:00:00:00:05:01', '10.0.5.254'),
+    'h4': ('s6', 1, '10.0.6.1', '00:00:00:00:06:01', '10.0.6.254'),
+})
 
 
 def get_topology_graph():
     """
-    Return the topology as an adjacency dict for path computation.
-    Keys are switch names, values are dicts of {neighbor: (local_port, remote_port, cost)}.
-
-    Port numbering follows Mininet addLink order:
-      - Port 1 on edge switches = host port
-      - Subsequent ports = switch-switch links
-    """
-    graph = {
-        's1': {
-            's2': (2, 2, 1),   # s1-eth2 <-> s2-eth2
-            's3': (3, 1, 1),   # s1-eth3 <-> s3-eth1
-            's5': (4, 2, 1),   # s1-eth4 <-> s5-eth2
-        },
-        's2': {
-            's1': (2, 2, 1),   # s2-eth2 <-> s1-eth2
-            's4': (3, 2, 1),   # s2-eth3 <-> s4-eth2
-            's6': (4, 3, 1),   # s2-eth4 <-> s6-eth3
-        },
-        's3': {
-            's1': (1, 3, 1),   # s3-eth1 <-> s1-eth3
-            's4': (2, 1, 1),   # s3-eth2 <-> s4-eth1
-            's5': (3, 4, 1),   # s3-eth3 <-> s5-eth4
-        },
-        's4': {
-            's3': (1, 2, 1),   # s4-eth1 <-> s3-eth2
-            's2': (2, 3, 1),   # s4-eth2 <-> s2-eth3
-            's6': (3, 4, 1),   # s4-eth3 <-> s6-eth4
-        },
-        's5': {
-            's1': (2, 4, 1),   # s5-eth2 <-> s1-eth4
-            's6': (3, 2, 1),   # s5-eth3 <-> s6-eth2
-            's3': (4, 3, 1),   # s5-eth4 <-> s3-eth3
-        },
-        's6': {
-            's5': (2, 3, 1),   # s6-eth2 <-> s5-eth3
-            's2': (3, 4, 1),   # s6-eth3 <-> s2-eth4
-            's4': (4, 3, 1),   # s6-eth4 <-> s4-eth3
-        },
-    }
-    return graph
+    Return the topology as an adjacency mapping for path computation.
+    Keys are switch names, values are mappings of {neighbor: (local_port, remote_port, cost)}.
+    The mapping is a shared read-only constant; callers must not try to mutate it.
+    """
+    return _TOPOLOGY_GRAPH
+
+
+# "No link" sentinels in the topology arrays
+NO_LINK_COST = np.iinfo(np.int8).max
+NO_PORT = -1
+
+
+def graph_to_arrays(graph):
+    """
+    Struct-of-arrays form of an adjacency dict, indexed by switch number.
+    Returns (cost, local_port, remote_port, name_to_idx) where the first
+    three are V x V int8 matrices: cost[i, j] is the link cost from i to j
+    (0 on the diagonal, NO_LINK_COST if unconnected) and the port matrices
+    hold the ports on each end of the link (NO_PORT if unconnected).
+    """
+    name_to_idx = {name: i for i, name in enumerate(sorted(graph))}
+    n = len(name_to_idx)
+    cost = np.full((n, n), NO_LINK_COST, dtype=np.int8)
+    np.fill_diagonal(cost, 0)
+    local_port = np.full((n, n), NO_PORT, dtype=np.int8)
+    remote_port = np.full((n, n), NO_PORT, dtype=np.int8)
+    for name, i in name_to_idx.items():
+        for neighbor, (lport, rport, c) in graph[name].items():
+            j = name_to_idx[neighbor]
+            cost[i, j] = c
+            local_port[i, j] = lport
+            remote_port[i, j] = rport
+    return cost, local_port, remote_port, name_to_idx
+
+
+@functools.lru_cache(maxsize=1)
+def get_topology_arrays():
+    """Return graph_to_arrays() of the topology graph (built once)."""
+    return graph_to_arrays(get_topology_graph())
+
+
+def graph_to_csr(graph):
+    """
+    Compressed sparse row form of an adjacency dict, indexed by switch
+    number. Returns (indptr, indices, cost, local_port, remote_port,
+    name_to_idx) as int32 arrays: the neighbors of node i are
+    indices[indptr[i]:indptr[i+1]], with the link costs and the ports on
+    each end of the link at the same offsets in the other three arrays.
+    """
+    name_to_idx = {name: i for i, name in enumerate(sorted(graph))}
+    degrees = [len(graph[name]) for name in name_to_idx]
+    indptr = np.zeros(len(name_to_idx) + 1, dtype=np.int32)
+    np.cumsum(degrees, out=indptr[1:])
+    indices, cost, local_port, remote_port = (
+        np.empty(indptr[-1], dtype=np.int32) for _ in range(4))
+    k = 0
+    for name in name_to_idx:
+        for neighbor, (lport, rport, c) in graph[name].items():
+            indices[k] = name_to_idx[neighbor]
+            cost[k] = c
+            local_port[k] = lport
+            remote_port[k] = rport
+            k += 1
+    return indptr, indices, cost, local_port, remote_port, name_to_idx
+
+
+@functools.lru_cache(maxsize=1)
+def get_adjacency_csr():
+    """Return graph_to_csr() of the topology graph (built once)."""
+    return graph_to_csr(get_topology_graph())
+
+
+def shortest_distances(cost):
+    """
+    All-pairs shortest-path distances from a graph_to_arrays() cost matrix,
+    via vectorized Floyd-Warshall. Unreachable pairs are inf.
+    """
+    dist = np.where(cost == NO_LINK_COST, np.inf, cost.astype(np.float64))
+    for k in range(len(dist)):
+        dist = np.minimum(dist, dist[:, k, None] + dist[None, k, :])
+    return dist
 
 
 def get_host_info():
     """
     Return host connection info: {host_name: (switch, port, ip, mac, gateway)}.
+    The mapping is a shared read-only constant; callers must not try to mutate it.
     """
-    return {
-        'h1': ('s1', 1, '10.0.1.1', '00:00:00:00:01:01', '10.0.1.254'),
-        'h2': ('s2', 1, '10.0.2.1', '00:00:00:00:02:01', '10.0.2.254'),
-        'h3': ('s5', 1, '10.0.5.1', '00:00:00:00:05:01', '10.0.5.254'),
-        'h4': ('s6', 1, '10.0.6.1', '00:00:00:00:06:01', '10.0.6.254'),
-    }
+    return _HOST_INFO
 
 
-def get_switch_mac(switch_name, port):
+# Switch name -> switch number, for the fixed set of switches s1..s6
+_SW_NUM = {f's{i}': i for i in range(1, 7)}
+
+
+def _switch_num(switch_name):
+    """Number of a switch named s<N>; a table lookup for the known switches."""
+    sw_num = _SW_NUM.get(switch_name)
+    return sw_num if sw_num is not None else int(switch_name[1:])
+
+
+def _format_switch_mac(switch_name, port):
     """Generate a deterministic MAC for a switch port."""
-    sw_num = int(switch_name[1:])
-    return f'00:00:0{sw_num}:00:00:{port:02x}'
+    return f'00:00:0{_switch_num(switch_name)}:00:00:{port:02x}'
+
+
+# (switch, port) -> MAC. Switch names and port numbers come from a small
+# fixed set, so the MACs are formatted once at import rather than per call.
+_SW_MAC_CACHE = {}
+
+
+def _build_mac_cache():
+    for switch_name in _SW_NUM:
+        for port in range(1, 5):
+            _SW_MAC_CACHE[switch_name, port] = _format_switch_mac(switch_name, port)
+
+
+def get_switch_mac(switch_name, port):
+    """Return the deterministic MAC of a switch port."""
+    mac = _SW_MAC_CACHE.get((switch_name, port))
+    if mac is None:
+        # Outside the precomputed range; fill lazily
+        mac = _SW_MAC_CACHE[switch_name, port] = _format_switch_mac(switch_name, port)
+    return mac
+
+
+_build_mac_cache()
 
 
 def get_thrift_port(switch_name):
     """Return the Thrift port for a given switch."""
-    sw_num = int(switch_name[1:])
-    return 9089 + sw_num  # s1=9090, s2=9091, ...
+    return 9089 + _switch_num(switch_name)  # s1=9090, s2=9091, ...
+
+
+def _neighbor_entries(host_info, fmt):
+    """
+    Static ARP entries (P4 switches don't do ARP) for every host: the other
+    hosts, plus the gateway, which is the MAC of the edge switch's host port.
+    fmt(ip, mac) builds one entry; each host's entry is built once and
+    shared by all the other hosts' lists.
+    """
+    own = {name: fmt(ip, mac)
+           for name, (_, _, ip, mac, _) in host_info.items()}
+    return {name: [entry for other, entry in own.items() if other != name]
+                  + [fmt(gw, get_switch_mac(sw_name, port))]
+            for name, (sw_name, port, _, _, gw) in host_info.items()}
+
+
+def _host_setup_script(host_name, host_info, arp_cmds):
+    """Shell script that applies all per-host settings in one invocation."""
+    cmds = [
+        # Disable IPv6 on all interfaces to prevent interference
+        'sysctl -w net.ipv6.conf.all.disable_ipv6=1'
+        ' net.ipv6.conf.default.disable_ipv6=1',
+    ]
+    if NetNS is None:
+        # P4Host.config() calls super(Host, self).config() which skips
+        # Host.config(), so defaultRoute is never applied. Add it manually.
+        gw = host_info[host_name][4]
+        cmds.append(f'ip route replace default via {gw} dev eth0')
+        cmds += arp_cmds
+    return '; '.join(cmds)
+
+
+def _program_host_netlink(h, host_info, neighbors):
+    """
+    Install the default route and static ARP entries over one netlink
+    socket inside the host's network namespace. Entries are replaced, so
+    re-running on a configured host succeeds, as with the shell commands.
+    """
+    gw = host_info[h.name][4]
+    try:
+        with NetNS(f'/proc/{h.pid}/ns/net') as ns:
+            ifindex = ns.link_lookup(ifname='eth0')[0]
+            # See _host_setup_script: P4Host never applies defaultRoute itself
+            ns.route('replace', dst='default', gateway=gw, oif=ifindex)
+            for ip, mac in neighbors:
+                ns.neigh('replace', dst=ip, lladdr=mac, ifindex=ifindex,
+                         state=NUD_STATES['permanent'])
+    except NetlinkError as e:
+        raise RuntimeError(f'{h.name}: host setup failed: {e}') from e
+
+
+def configure_hosts(net, host_info):
+    """
+    Disable IPv6 and install the default route and static ARP entries on
+    every host. The sysctls run as one script through popen() (no cmd()
+    prompt round trips); routes and neighbors go over netlink via pyroute2
+    when it is installed, else they are appended to the script. The
+    scripts run on all hosts in parallel. Either way, a failed step raises
+    RuntimeError.
+    """
+    if NetNS is None:
+        neighbors = _neighbor_entries(host_info, 'arp -s {} {}'.format)
+    else:
+        neighbors = _neighbor_entries(host_info, lambda ip, mac: (ip, mac))
+
+    def configure(h):
+        script = _host_setup_script(h.name, host_info, neighbors[h.name])
+        # -e: stop at the first failing command and report it
+        p = h.popen(['sh', '-ec', script])
+        out, err = p.communicate()
+        if p.returncode:
+            msg = err or out
+            if isinstance(msg, bytes):
+                msg = msg.decode(errors='replace')
+            raise RuntimeError(f'{h.name}: host setup failed: {msg.strip()}')
+
+    with ThreadPoolExecutor(max_workers=len(net.hosts)) as ex:
+        list(ex.map(configure, net.hosts))
+
+    if NetNS is not None:
+        # NetNS forks a helper process per namespace; open them one at a time
+        for h in net.hosts:
+            _program_host_netlink(h, host_info, neighbors[h.name])
 
 
 def main():
@@ -198,7 +545,9 @@ def main():
     args = parser.parse_args()
 
     p4_json = os.path.abspath(args.p4_json)
-    if not os.path.exists(p4_json):
+    try:
+        os.stat(p4_json)
+    except FileNotFoundError:
         print(f'Error: P4 JSON not found at {p4_json}')
         print('Run "make compile" first to build the P4 program.')
         sys.exit(1)
@@ -209,32 +558,11 @@ def main():
     topo = AdaptiveRoutingTopo(p4_json=p4_json, bw=args.bw)
 
     info('*** Starting network\n')
-    net = Mininet(topo=topo, controller=None)
+    net = AdaptiveRoutingNet(topo=topo, controller=None)
     net.start()
 
-    # Disable IPv6 on all interfaces to prevent interference
-    for host in net.hosts:
-        host.cmd('sysctl -w net.ipv6.conf.all.disable_ipv6=1')
-        host.cmd('sysctl -w net.ipv6.conf.default.disable_ipv6=1')
-
-    # P4Host.config() calls super(Host, self).config() which skips
-    # Host.config(), so defaultRoute is never applied. Add them manually.
-    host_info = get_host_info()
-    for h in net.hosts:
-        sw_name, port, ip, mac, gw = host_info[h.name]
-        h.cmd(f'ip route add default via {gw} dev eth0')
-        info(f'  {h.name}: default route via {gw}\n')
-
-    # Set ARP entries statically (since P4 switches don't do ARP)
-    for h in net.hosts:
-        for other_name, (sw, port, ip, mac, gw) in host_info.items():
-            if other_name != h.name:
-                h.cmd(f'arp -s {ip} {mac}')
-        # Also set gateway MAC (switch port MAC)
-        sw_name = host_info[h.name][0]
-        gw_ip = host_info[h.name][4]
-        gw_mac = get_switch_mac(sw_name, host_info[h.name][1])
-        h.cmd(f'arp -s {gw_ip} {gw_mac}')
+    info('*** Configuring hosts\n')
+    configure_hosts(net, get_host_info())
 
     info('\n*** Network is ready. Run the controller to populate tables.\n')
     info('*** Use: python controller/controller.py\n\n')